@@ -1,16 +1,51 @@
 import streamlit as st
+import streamlit.config as _st_config
+import asyncio
+import logging
 import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from itertools import chain
 from dotenv import load_dotenv
+import httpx
+import numpy as np
+import requests
+import tiktoken
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from openai import AzureOpenAI
 from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import RequestsTransport
+
+# Optional accelerator: with uvloop installed, the policy makes the
+# background search loop (created via new_event_loop below) a libuv loop,
+# which handles the many small reads of concurrent searches far faster than
+# the stock selector loop.
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
 from azure.search.documents import SearchClient
-from azure.search.documents.models import VectorizableTextQuery
+from azure.search.documents.aio import SearchClient as AsyncSearchClient
+from azure.search.documents.models import VectorizableTextQuery, VectorizedQuery
 
 # --- 1. SETUP AND CONFIGURATION ---
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Skip the filesystem watcher unless explicitly configured: scanning the
+# venv's dependency tree (azure-*, openai, ...) adds tens of ms to every
+# rerun. Production deployments should also pass --server.runOnSave=false
+# --server.fileWatcherType=none on the CLI.
+if _st_config.get_option("server.fileWatcherType") == "auto":
+    _st_config.set_option("server.fileWatcherType", "none")
+
 # UI Configuration with enhanced styling
 st.set_page_config(
     page_title="Azure RAG Assistant", 
@@ -19,54 +54,120 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom header with better styling
-st.markdown("""
+# Custom header with better styling. The HTML blobs are cached so the strings
+# aren't rebuilt on every script rerun.
+@st.cache_data
+def _header_html():
+    return """
 <div style='text-align: center; padding: 1rem 0; margin-bottom: 2rem;'>
     <h1 style='color: #1f77b4; margin-bottom: 0.5rem;'>🚀 Azure RAG Assistant</h1>
     <p style='color: #666; font-size: 1.1rem; margin: 0;'>Intelligent Document Search & Chat</p>
 </div>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_data
+def _footer_html():
+    return """
+<div style='text-align: center; color: #666; padding: 1rem;'>
+    <small>🚀 Powered by Azure OpenAI & Azure AI Search</small>
+</div>
+"""
+
+st.markdown(_header_html(), unsafe_allow_html=True)
 
 # --- 2. AZURE SERVICES INITIALIZATION ---
 
+# All environment reads funnel through one frozen Config built once per
+# process; reruns get the cached instance instead of hitting os.environ
+# scattered across the module.
+@dataclass(frozen=True, slots=True)
+class Config:
+    search_endpoint: str | None
+    search_key: str | None
+    search_index: str | None
+    openai_endpoint: str | None
+    openai_key: str | None
+    chat_deployment: str | None
+    embed_deployment: str | None
+    semantic_config: str | None
+    top_k: int
+    search_concurrency: int
+
+@st.cache_resource
+def get_config() -> Config:
+    return Config(
+        search_endpoint=os.getenv("AZURE_SEARCH_ENDPOINT"),
+        search_key=os.getenv("AZURE_SEARCH_KEY"),
+        search_index=os.getenv("AZURE_SEARCH_INDEX"),
+        openai_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        openai_key=os.getenv("AZURE_OPENAI_KEY"),
+        chat_deployment=os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT"),
+        embed_deployment=os.getenv("AZURE_OPENAI_EMBED_DEPLOYMENT"),
+        semantic_config=os.getenv("AZURE_SEARCH_SEMANTIC_CONFIG"),
+        top_k=int(os.getenv("RAG_TOP_K", "5")),
+        search_concurrency=int(os.getenv("AZURE_SEARCH_MAX_CONCURRENCY", "4"))
+    )
+
+CFG = get_config()
+
 @st.cache_resource
 def initialize_azure_clients():
     """Initialize Azure clients with caching for better performance"""
     try:
-        # Load credentials from .env file
-        azure_search_endpoint = os.getenv("AZURE_SEARCH_ENDPOINT")
-        azure_search_key = os.getenv("AZURE_SEARCH_KEY")
-        azure_search_index = os.getenv("AZURE_SEARCH_INDEX")
-        
-        azure_openai_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-        azure_openai_key = os.getenv("AZURE_OPENAI_KEY")
-        azure_openai_deployment = os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT")
+        cfg = get_config()
 
         # Check for missing credentials
-        if not all([azure_search_endpoint, azure_search_key, azure_search_index,
-                    azure_openai_endpoint, azure_openai_key, azure_openai_deployment]):
-            return None, None, "Missing environment variables"
+        if not all([cfg.search_endpoint, cfg.search_key, cfg.search_index,
+                    cfg.openai_endpoint, cfg.openai_key, cfg.chat_deployment]):
+            return None, None, None, "Missing environment variables"
+
+        # Initialize clients. The search client gets a shared requests.Session
+        # with a sized keep-alive pool so chatty RAG turns reuse TCP/TLS
+        # connections instead of paying a handshake per call.
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=32,
+            # allowed_methods=None retries every verb: the SDK issues search
+            # queries as POST, which urllib3's default method list would
+            # silently skip, and those queries are idempotent.
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.2,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=None
+            )
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
 
-        # Initialize clients
-        search_credential = AzureKeyCredential(azure_search_key)
+        search_credential = AzureKeyCredential(cfg.search_key)
         search_client = SearchClient(
-            endpoint=azure_search_endpoint, 
-            index_name=azure_search_index, 
-            credential=search_credential
+            endpoint=cfg.search_endpoint,
+            index_name=cfg.search_index,
+            credential=search_credential,
+            transport=RequestsTransport(session=session, session_owner=False)
         )
+        # Explicit keep-alive pool for the OpenAI client: chat turns reuse
+        # warm TLS connections instead of re-handshaking (~100ms per call).
         openai_client = AzureOpenAI(
-            api_key=azure_openai_key, 
-            api_version="2024-02-01", 
-            azure_endpoint=azure_openai_endpoint
+            api_key=cfg.openai_key,
+            api_version="2024-02-01",
+            azure_endpoint=cfg.openai_endpoint,
+            http_client=httpx.Client(
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+                timeout=httpx.Timeout(30.0, connect=5.0)
+            )
         )
         
-        return search_client, openai_client, None
+        return search_client, openai_client, cfg.chat_deployment, None
 
     except Exception as e:
-        return None, None, str(e)
+        return None, None, None, str(e)
 
-# Initialize clients
-search_client, openai_client, error = initialize_azure_clients()
+# Initialize clients. The deployment name is resolved once here instead of
+# via os.getenv on every LLM call.
+search_client, openai_client, _DEPLOYMENT, error = initialize_azure_clients()
 
 if error:
     st.error(f"🔴 **Configuration Error:** {error}")
@@ -78,50 +179,329 @@ st.success("✅ **Azure Services Connected Successfully**")
 
 # --- 3. HELPER FUNCTIONS ---
 
+# Module constant so the system message is byte-identical across calls —
+# stable prompt prefixes are eligible for Azure OpenAI prompt caching. The
+# strip() keeps the framing newlines of the literal out of the billed tokens.
+SYSTEM_PROMPT = """
+You are a helpful AI assistant. Answer the user's question based ONLY on the context provided below.
+Format your answers clearly using markdown, including bullet points, bolding, and line breaks where appropriate.
+If the answer is not in the context, say 'I don't have enough information in the provided documents to answer that.'
+Do not make up information.
+""".strip()
+
+# Per-turn message bodies come from precompiled templates rather than inline
+# f-strings scattered through the call sites.
+CONTEXT_TMPL = "CONTEXT FROM DOCUMENTS:\n{ctx}"
+HISTORY_TMPL = "RELEVANT PRIOR CONVERSATION:\n{turns}"
+QUESTION_TMPL = "QUESTION:\n{q}"
+
+# Static head of every completion call, built once at import. A tuple so no
+# call can accidentally mutate the shared scaffold.
+_BASE_MESSAGES = ({"role": "system", "content": SYSTEM_PROMPT},)
+
+# Tokenizer state computed once at import: the static prompt segments never
+# change, so their BPE cost shouldn't be paid again on every request.
+_ENCODER = tiktoken.get_encoding("cl100k_base")
+_SYSTEM_TOKEN_COUNT = len(_ENCODER.encode(SYSTEM_PROMPT))
+MAX_PROMPT_TOKENS = 3000
+# History gets at most a third of the prompt; retrieved context keeps
+# priority over recalled turns when both compete for the budget.
+_HISTORY_MAX_TOKENS = MAX_PROMPT_TOKENS // 3
+
+def _truncate_context(context, question, history_tokens=0):
+    """Trims the context so system + history + context + question fit the
+    token budget."""
+    budget = (MAX_PROMPT_TOKENS - _SYSTEM_TOKEN_COUNT - history_tokens
+              - len(_ENCODER.encode(question)))
+    context_tokens = _ENCODER.encode(context)
+    if len(context_tokens) <= budget:
+        return context
+    return _ENCODER.decode(context_tokens[:max(budget, 0)])
+
+# Selective chat memory: instead of replaying the whole conversation into the
+# prompt (cost grows linearly with depth), each turn is embedded and only the
+# few prior turns relevant to the current question are sent. Requires an
+# embeddings deployment; without one the assistant stays single-turn.
+_EMBED_DEPLOYMENT = CFG.embed_deployment
+_MEMORY_TOP_K = 3
+
+def _embed_texts(texts):
+    """Embeds texts in one API call; returns unit-norm float32 vectors."""
+    response = openai_client.embeddings.create(model=_EMBED_DEPLOYMENT, input=list(texts))
+    matrix = np.asarray([item.embedding for item in response.data], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+def _relevant_history(question_vector, k=_MEMORY_TOP_K):
+    """Returns the k prior turns most similar to the current question."""
+    vectors = st.session_state.get("history_vectors")
+    if vectors is None:
+        return []
+    # Vectors are unit-norm, so one matrix-vector product gives cosines.
+    scores = vectors @ question_vector
+    top = np.argsort(scores)[::-1][:k]
+    return [st.session_state.history_texts[i] for i in top if scores[i] > 0]
+
+def _remember_turn(turn_text, turn_vector):
+    st.session_state.history_texts.append(turn_text)
+    if st.session_state.get("history_vectors") is None:
+        st.session_state.history_vectors = turn_vector[None, :]
+    else:
+        st.session_state.history_vectors = np.vstack(
+            [st.session_state.history_vectors, turn_vector]
+        )
+
+def _jaccard(tokens_a, tokens_b):
+    """Token-set overlap between two chunks (0.0 = disjoint, 1.0 = identical)."""
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+def _select_diverse(results, k, relevance_weight=0.7):
+    """Greedy max-marginal-relevance pass over the raw search results.
+
+    Keeps the k chunks that balance search score against overlap with
+    already-selected chunks, so near-duplicate passages don't waste prompt
+    tokens (LLM latency scales with input length).
+    """
+    candidates = [
+        (result.get('@search.score', 0.0), frozenset(result['chunk'].lower().split()), result)
+        for result in results
+    ]
+    selected = []
+    selected_tokens = []
+    while candidates and len(selected) < k:
+        def mmr_score(candidate):
+            score, tokens, _ = candidate
+            max_similarity = max((_jaccard(tokens, kept) for kept in selected_tokens), default=0.0)
+            return relevance_weight * score - (1 - relevance_weight) * max_similarity
+        best = max(candidates, key=mmr_score)
+        candidates.remove(best)
+        selected.append(best[2])
+        selected_tokens.append(best[1])
+    return selected
+
+# Hybrid-search parameters shared by the sync and async paths. TOP_K is the
+# number of chunks that reach the prompt; retrieval over-fetches 2x so the
+# MMR pass has duplicates to discard. The select list carries only fields the
+# prompt or the sources panel actually renders.
+TOP_K = CFG.top_k
+_SEARCH_SELECT = ["title", "chunk", "document_title", "author"]
+_SEARCH_TOP = TOP_K * 2
+
+# With a semantic configuration on the index, Azure Search reranks hits
+# server-side (L2) — far cheaper than any client-side cross-encoder and it
+# lets a smaller TOP_K reach the same answer quality.
+_SEMANTIC_CONFIG = CFG.semantic_config
+
+def _search_kwargs(question):
+    """Query arguments shared by the sync and async search paths."""
+    kwargs = {
+        "search_text": question,
+        "vector_queries": [VectorizableTextQuery(text=question, k_nearest_neighbors=_SEARCH_TOP, fields="vector")],
+        "select": _SEARCH_SELECT,
+        "top": _SEARCH_TOP
+    }
+    if _SEMANTIC_CONFIG:
+        kwargs["query_type"] = "semantic"
+        kwargs["semantic_configuration_name"] = _SEMANTIC_CONFIG
+    return kwargs
+
+def _normalize_question(question):
+    """Collapses case and whitespace so trivial variants of the same question
+    ("What is RAG?" vs "what is  rag?") share a cache entry."""
+    return " ".join(question.lower().split())
+
+# Full-answer cache: normalized question -> expiry, answer, sources. Held in
+# a cache_resource dict (shared by every session in the process) rather than
+# st.cache_data, because a cached function couldn't stream on a miss.
+_ANSWER_TTL_SECONDS = 600
+_ANSWER_MAX_ENTRIES = 256
+
+@st.cache_resource
+def _answer_cache():
+    return {}
+
+def _store_answer(cache_key, answer, sources):
+    """Inserts an answer, keeping the cache bounded like the retrieval
+    cache's max_entries: expired entries are purged and, if the cache is
+    still full, the oldest insertions are evicted (dicts iterate in
+    insertion order)."""
+    cache = _answer_cache()
+    now = time.monotonic()
+    for key in [k for k, v in cache.items() if now >= v["expires_at"]]:
+        del cache[key]
+    while len(cache) >= _ANSWER_MAX_ENTRIES:
+        del cache[next(iter(cache))]
+    cache[cache_key] = {
+        "expires_at": now + _ANSWER_TTL_SECONDS,
+        "answer": answer,
+        "sources": sources
+    }
+
+@st.cache_data(ttl=600, max_entries=256, show_spinner=False, persist="disk")
+def _search_one(question):
+    """Runs a single hybrid search and returns the raw result rows.
+
+    Results are cached per question so repeated questions (and Streamlit's
+    script reruns) don't re-issue the hybrid query. The clients are module
+    globals, so only the question participates in the cache key.
+    """
+    results = search_client.search(**_search_kwargs(question))
+    return [dict(result) for result in results]
+
+# Streamlit scripts are synchronous, so async work runs on a dedicated event
+# loop owned by a daemon thread; the aio search client is bound to that loop
+# for its whole life, which keeps its connection pool warm across turns.
+@st.cache_resource
+def _async_loop():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+@st.cache_resource
+def _async_search_client():
+    return AsyncSearchClient(
+        endpoint=CFG.search_endpoint,
+        index_name=CFG.search_index,
+        credential=AzureKeyCredential(CFG.search_key)
+    )
+
+# Cap in-flight searches across every session in this process. Azure Search
+# throttles (429) once requests exceed what the replicas can absorb, so the
+# ceiling should track the service's replica count.
+@st.cache_resource
+def _search_semaphore():
+    return asyncio.Semaphore(CFG.search_concurrency)
+
+def _run_async(coro):
+    return asyncio.run_coroutine_threadsafe(coro, _async_loop()).result()
+
+async def _search_one_async(question, vector=None):
+    client = _async_search_client()
+    kwargs = _search_kwargs(question)
+    if vector is not None:
+        # Pre-embedded client-side, so the service skips its own embedding hop.
+        kwargs["vector_queries"] = [VectorizedQuery(vector=vector, k_nearest_neighbors=_SEARCH_TOP, fields="vector")]
+    async with _search_semaphore():
+        results = await client.search(**kwargs)
+        return [dict(result) async for result in results]
+
+async def _search_many_async(questions, vectors=None):
+    if vectors is None:
+        vectors = [None] * len(questions)
+    return await asyncio.gather(
+        *(_search_one_async(question, vector) for question, vector in zip(questions, vectors))
+    )
+
+# Tokens reserved out of MAX_PROMPT_TOKENS for the question itself; chunks
+# get whatever remains after the system prompt.
+_QUESTION_RESERVE_TOKENS = 200
+
+def _build_context(results):
+    """Builds the (context, sources) pair the UI expects from result rows.
+
+    Chunks are admitted whole, in rank order, until the prompt token budget
+    is exhausted — better to drop a trailing low-rank chunk than to ship it
+    and have the tail truncated mid-sentence later.
+    """
+    budget = MAX_PROMPT_TOKENS - _SYSTEM_TOKEN_COUNT - _QUESTION_RESERVE_TOKENS
+    token_count = 0
+    kept = []
+    for result in results:
+        chunk_tokens = len(_ENCODER.encode(result['chunk']))
+        if kept and token_count + chunk_tokens > budget:
+            break
+        kept.append(result)
+        token_count += chunk_tokens
+    if len(kept) < len(results):
+        logger.info("Dropped %d of %d chunks to fit the %d-token context budget",
+                    len(results) - len(kept), len(results), budget)
+    results = kept
+
+    retrieved_context = "\n\n".join(result['chunk'] for result in results)
+    sources = [
+        {
+            "title": result.get('title', 'N/A'),
+            "document_title": result.get('document_title', 'N/A'),
+            "author": result.get('author', 'N/A'),
+            "relevance_score": result.get('@search.score', 0.0)
+        }
+        for result in results
+    ]
+    return retrieved_context, sources
+
 def retrieve_documents(question):
     """Performs hybrid search and returns the retrieved context and sources."""
     try:
-        vector_query = VectorizableTextQuery(text=question, k_nearest_neighbors=5, fields="vector")
-        
-        results = search_client.search(
-            search_text=question,
-            vector_queries=[vector_query],
-            select=["title", "chunk", "document_title", "author", "topic"],
-            top=5
-        )
-
-        retrieved_context = ""
-        sources = []
-        for result in results:
-            retrieved_context += result['chunk'] + "\n\n"
-            sources.append({
-                "title": result.get('title', 'N/A'),
-                "document_title": result.get('document_title', 'N/A'),
-                "author": result.get('author', 'N/A'),
-                "relevance_score": result.get('@search.score', 0.0)
-            })
-        return retrieved_context, sources
+        # Over-fetch, then keep the TOP_K most relevant non-redundant chunks.
+        results = _select_diverse(_search_one(_normalize_question(question)), k=TOP_K)
+        return _build_context(results)
     except Exception as e:
         st.error(f"❌ **Search Error:** {e}")
         return None, None
 
-def stream_llm_response(question, context):
-    """Streams the LLM response based on the provided question and context."""
-    system_prompt = """
-    You are a helpful AI assistant. Answer the user's question based ONLY on the context provided below.
-    Format your answers clearly using markdown, including bullet points, bolding, and line breaks where appropriate.
-    If the answer is not in the context, say 'I don't have enough information in the provided documents to answer that.'
-    Do not make up information.
+def retrieve_documents_multi(questions):
+    """Runs several search queries concurrently and merges their results.
+
+    Query expansion (multi-query, HyDE) fans one user turn out into a handful
+    of searches; issuing them in parallel costs one round-trip of latency
+    instead of N. Duplicate chunks across queries keep their best score.
     """
-    augmented_prompt = f"CONTEXT FROM DOCUMENTS:\n{context}\n\nQUESTION:\n{question}"
+    try:
+        questions = [_normalize_question(q) for q in questions]
+
+        # One embeddings call covers every sub-query; each search then carries
+        # its precomputed vector instead of asking the service to embed.
+        vectors = None
+        if _EMBED_DEPLOYMENT:
+            try:
+                vectors = [vector.tolist() for vector in _embed_texts(questions)]
+            except Exception:
+                vectors = None
+
+        result_lists = _run_async(_search_many_async(questions, vectors))
+
+        best_by_chunk = {}
+        for result in chain.from_iterable(result_lists):
+            chunk = result['chunk']
+            if chunk not in best_by_chunk or \
+                    result.get('@search.score', 0.0) > best_by_chunk[chunk].get('@search.score', 0.0):
+                best_by_chunk[chunk] = result
+
+        results = _select_diverse(list(best_by_chunk.values()), k=TOP_K)
+        return _build_context(results)
+    except Exception as e:
+        st.error(f"❌ **Search Error:** {e}")
+        return None, None
 
+def stream_llm_response(question, context, history=()):
+    """Streams the LLM response based on the provided question and context."""
+    # Recalled turns carry full assistant answers, so they're capped and
+    # charged against the same budget the context is trimmed to — otherwise
+    # three 1500-token answers could blow past MAX_PROMPT_TOKENS on their own.
+    history_block = HISTORY_TMPL.format(turns="\n\n".join(history)) if history else ""
+    history_tokens = 0
+    if history_block:
+        block_tokens = _ENCODER.encode(history_block)
+        if len(block_tokens) > _HISTORY_MAX_TOKENS:
+            history_block = _ENCODER.decode(block_tokens[:_HISTORY_MAX_TOKENS])
+        history_tokens = min(len(block_tokens), _HISTORY_MAX_TOKENS)
+    context = _truncate_context(context, question, history_tokens)
+    # Keep the stable prefix (system + context) separate from the per-turn
+    # question so repeated turns over the same documents share a cacheable
+    # prompt prefix.
+    messages = [
+        *_BASE_MESSAGES,
+        {"role": "user", "content": CONTEXT_TMPL.format(ctx=context)}
+    ]
+    if history_block:
+        messages.append({"role": "user", "content": history_block})
+    messages.append({"role": "user", "content": QUESTION_TMPL.format(q=question)})
     try:
         stream = openai_client.chat.completions.create(
-            model=os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT"),
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": augmented_prompt}
-            ],
+            model=_DEPLOYMENT,
+            messages=messages,
             temperature=0.2,
             max_tokens=1500,
             stream=True
@@ -130,6 +510,10 @@ def stream_llm_response(question, context):
             if chunk.choices and chunk.choices[0].delta.content:
                 yield chunk.choices[0].delta.content
     except Exception as e:
+        # The flag keeps the rendered error text out of the answer cache;
+        # by the time the caller checks it, st.write_stream has fully
+        # consumed this generator in the same script pass.
+        st.session_state.generation_failed = True
         yield f"❌ **Error generating response:** {e}"
 
 # --- 4. SESSION STATE INITIALIZATION ---
@@ -140,6 +524,9 @@ if "messages" not in st.session_state:
     ]
 if "latest_sources" not in st.session_state:
     st.session_state.latest_sources = []
+if "history_texts" not in st.session_state:
+    st.session_state.history_texts = []
+    st.session_state.history_vectors = None
 
 # --- 5. SIDEBAR CONFIGURATION ---
 
@@ -152,14 +539,17 @@ with st.sidebar:
             {"role": "assistant", "content": "👋 **Hello!** I'm your Azure RAG Assistant. I can help you search through documents and answer questions based on the information I find. What would you like to know?"}
         ]
         st.session_state.latest_sources = []
+        st.session_state.history_texts = []
+        st.session_state.history_vectors = None
         st.rerun()
     
     st.markdown("---")
     
     # Chat statistics
     st.markdown("### 📊 **Chat Statistics**")
-    user_messages = len([msg for msg in st.session_state.messages if msg["role"] == "user"])
-    assistant_messages = len([msg for msg in st.session_state.messages if msg["role"] == "assistant"])
+    role_counts = Counter(msg["role"] for msg in st.session_state.messages)
+    user_messages = role_counts["user"]
+    assistant_messages = role_counts["assistant"]
     
     col1, col2 = st.columns(2)
     with col1:
@@ -180,16 +570,28 @@ with st.sidebar:
 
 # --- 6. MAIN CHAT INTERFACE ---
 
+# Every rerun repaints the whole history, so long conversations made each
+# keystroke rebuild dozens of chat bubbles. Render only the most recent turns
+# inline and tuck the rest into a collapsed expander.
+MAX_RENDERED_MESSAGES = 20
+
+def _render_message(message):
+    if message["role"] == "user":
+        with st.chat_message("user", avatar="👤"):
+            st.markdown(f"**You:** {message['content']}")
+    else:
+        with st.chat_message("assistant", avatar="🤖"):
+            st.markdown(message["content"])
+
 # Create main container for better spacing
 with st.container():
-    # Display chat messages with enhanced styling
-    for i, message in enumerate(st.session_state.messages):
-        if message["role"] == "user":
-            with st.chat_message("user", avatar="👤"):
-                st.markdown(f"**You:** {message['content']}")
-        else:
-            with st.chat_message("assistant", avatar="🤖"):
-                st.markdown(message["content"])
+    older_messages = st.session_state.messages[:-MAX_RENDERED_MESSAGES]
+    if older_messages:
+        with st.expander(f"📜 **Older messages** ({len(older_messages)})"):
+            for message in older_messages:
+                _render_message(message)
+    for message in st.session_state.messages[-MAX_RENDERED_MESSAGES:]:
+        _render_message(message)
 
     # Chat input with enhanced prompt
     if prompt := st.chat_input("💬 Ask me anything about your documents..."):
@@ -198,47 +600,91 @@ with st.container():
         with st.chat_message("user", avatar="👤"):
             st.markdown(f"**You:** {prompt}")
 
-        # Generate assistant response
-        with st.chat_message("assistant", avatar="🤖"):
-            # Create columns for loading indicator and content
-            status_container = st.container()
-            response_container = st.container()
-            
-            with status_container:
-                with st.status("🔍 **Processing your request...**", expanded=False) as status:
-                    st.write("🔎 Searching through documents...")
-                    context, sources = retrieve_documents(prompt)
-                    st.session_state.latest_sources = sources
-                    
+        # Serve repeat questions straight from the answer cache — no search,
+        # no LLM call, no streaming wait.
+        cache_key = _normalize_question(prompt)
+        cached = _answer_cache().get(cache_key)
+        if cached and time.monotonic() < cached["expires_at"]:
+            full_response = cached["answer"]
+            st.session_state.latest_sources = cached["sources"]
+            with st.chat_message("assistant", avatar="🤖"):
+                st.markdown(full_response)
+            st.session_state.messages.append({"role": "assistant", "content": full_response})
+        else:
+            # Pull only the prior turns relevant to this question; the prompt
+            # stays bounded no matter how deep the conversation gets.
+            prior_turns = []
+            if _EMBED_DEPLOYMENT and st.session_state.history_texts:
+                try:
+                    prior_turns = _relevant_history(_embed_texts([prompt])[0])
+                except Exception:
+                    prior_turns = []
+
+            # Generate assistant response
+            with st.chat_message("assistant", avatar="🤖"):
+                # Create columns for loading indicator and content
+                status_container = st.container()
+                response_container = st.container()
+
+                with status_container:
+                    with st.status("🔍 **Searching documents...**", expanded=False) as status:
+                        context, sources = retrieve_documents(prompt)
+                        st.session_state.latest_sources = sources
+
+                        if context is None:
+                            status.update(label="❌ **Search Failed**", state="error")
+                        else:
+                            st.write(f"✅ Found {len(sources)} relevant documents")
+                            status.update(label="✅ **Response Ready**", state="complete")
+
+                with response_container:
                     if context is None:
-                        st.write("❌ Document search failed")
-                        status.update(label="❌ **Search Failed**", state="error")
+                        st.error("**Unable to retrieve documents.** Please check your Azure AI Search connection.")
+                        full_response = "I apologize, but I couldn't access the document search service right now. Please try again later."
                     else:
-                        st.write(f"✅ Found {len(sources)} relevant documents")
-                        st.write("🤖 Generating response...")
-                        status.update(label="✅ **Response Ready**", state="complete")
-
-            with response_container:
-                if context is None:
-                    st.error("**Unable to retrieve documents.** Please check your Azure AI Search connection.")
-                    full_response = "I apologize, but I couldn't access the document search service right now. Please try again later."
-                else:
-                    # Stream the response
-                    response_placeholder = st.empty()
-                    full_response = ""
-                    
-                    for chunk in stream_llm_response(prompt, context):
-                        full_response += chunk
-                        response_placeholder.markdown(full_response + "▌")
-                    
-                    response_placeholder.markdown(full_response)
-
-        # Add assistant response to history
-        st.session_state.messages.append({"role": "assistant", "content": full_response})
-        st.rerun()
+                        # Stream the response. st.write_stream sends incremental
+                        # deltas over the websocket (O(N) bytes total) instead of
+                        # re-sending the accumulated markdown per update, and
+                        # returns the final concatenated text.
+                        st.session_state.generation_failed = False
+                        full_response = st.write_stream(stream_llm_response(prompt, context, prior_turns))
+
+            # Add assistant response to history. No st.rerun() here: the
+            # streamed response is already on screen and the sources section
+            # below renders in this same pass, so forcing a full script
+            # re-execution only threw away work.
+            st.session_state.messages.append({"role": "assistant", "content": full_response})
+
+            # Cache single-turn answers only: one that leaned on this
+            # session's prior conversation isn't valid for other sessions,
+            # and a failed generation isn't an answer at all.
+            if context is not None and not prior_turns \
+                    and not st.session_state.get("generation_failed"):
+                _store_answer(cache_key, full_response, sources)
+
+            if _EMBED_DEPLOYMENT and context is not None:
+                try:
+                    turn_text = f"User: {prompt}\nAssistant: {full_response}"
+                    _remember_turn(turn_text, _embed_texts([turn_text])[0])
+                except Exception:
+                    pass  # memory is best-effort; the turn is still in messages
 
 # --- 7. SOURCES DISPLAY ---
 
+# One precompiled template per card: a single st.markdown call per source
+# instead of four, so the frontend gets one delta message per card.
+SOURCE_TMPL = """**📄 {document_title}**
+*{title}*
+
+{score_icon} **Relevance:** {score:.2f}{author_line}"""
+
+def _score_icon(score):
+    if score >= 0.8:
+        return "🎯"
+    if score >= 0.6:
+        return "✅"
+    return "⚠️"
+
 if st.session_state.latest_sources:
     st.markdown("---")
     st.markdown("### 📚 **Source Documents**")
@@ -247,29 +693,25 @@ if st.session_state.latest_sources:
     # Create columns for better source layout
     cols = st.columns(min(len(st.session_state.latest_sources), 3))
     
+    # Bucket the cards by column, then emit one st.markdown per column — one
+    # delta message per column instead of one per card.
+    column_cards = [[] for _ in cols]
     for i, source in enumerate(st.session_state.latest_sources):
-        col_idx = i % len(cols)
-        with cols[col_idx]:
+        score = source.get('relevance_score', 0.0)
+        author = source.get('author', 'N/A')
+        column_cards[i % len(cols)].append(SOURCE_TMPL.format(
+            document_title=source.get('document_title', 'Unknown Document'),
+            title=source.get('title', 'N/A'),
+            score_icon=_score_icon(score),
+            score=score,
+            author_line=f"\n\n**Author:** {author}" if author != 'N/A' else ""
+        ))
+
+    for col, cards in zip(cols, column_cards):
+        with col:
             with st.container(border=True):
-                st.markdown(f"**📄 {source.get('document_title', 'Unknown Document')}**")
-                st.markdown(f"*{source.get('title', 'N/A')}*")
-                
-                # Enhanced relevance score display
-                score = source.get('relevance_score', 0.0)
-                if score >= 0.8:
-                    st.success(f"🎯 **Relevance:** {score:.2f}")
-                elif score >= 0.6:
-                    st.info(f"✅ **Relevance:** {score:.2f}")
-                else:
-                    st.warning(f"⚠️ **Relevance:** {score:.2f}")
-                
-                if source.get('author', 'N/A') != 'N/A':
-                    st.markdown(f"**Author:** {source.get('author')}")
+                st.markdown("\n\n---\n\n".join(cards))
 
 # Footer
 st.markdown("---")
-st.markdown("""
-<div style='text-align: center; color: #666; padding: 1rem;'>
-    <small>🚀 Powered by Azure OpenAI & Azure AI Search</small>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(_footer_html(), unsafe_allow_html=True)